@@ -39,28 +39,41 @@
 #       - _filename_, which is the name of the HTML source file.
 #       - _source_folder_, which is the relative path to the location of the HTML source file.
 #       - _output_root_, which is the location to which you want tubochopper to write.
+#       - _DUPLICATES_TRIGGERS_ERROR_, which stops the run before anything is written when two h1 tags give the same file name.
+#       - _VERBOSE_, which sets the log level. Without it, the per-topic lines and the paths of the written files are not shown.
+#       - _MAX_WORKERS_, which is the number of processes that write the topics (None means one per CPU).
+#       - _TOPICS_PER_TASK_, which is the number of topics sent to a worker process at a time.
 #   -# Run the script.
 #
 # (c) 2021 Kristi Conley. All rights reserved.
 
 # Imports
+import collections
+import copy
+import functools
+import logging
 import os
+import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
 from slugify import slugify
 
-from bs4 import BeautifulSoup
-from bs4.element import Tag
-from bs4.element import Comment
-from bs4.element import NavigableString
+from lxml import etree
 
 DUPLICATES_TRIGGERS_ERROR = False
+VERBOSE = False
 
-VALID_ELEMENTS = ['p']
+VALID_ELEMENTS = frozenset(('p',))
 
 XMLNS_DITAARCH = "http://dita.oasis-open.org/architecture/2005/"
 EXTN_XML = '.xml'
 
+SOURCE_ENCODING = 'utf-8'
+
+MAX_WORKERS = None  # None means one per CPU
+TOPICS_PER_TASK = 32
+
 filename = 'example.html'
 source_folder = '/Users/kconley/poc_md2xml'
 
@@ -68,319 +81,86 @@ full_path = os.path.join(source_folder, filename)
 
 output_root = '/Users/kconley/Desktop/xfer to Win 10 VM/turbo_chopper_output'
 
-
-def parse_this(html):
-    return BeautifulSoup(html, features="lxml")
-    # return BeautifulSoup(html, features="html.parser")
-
-
-class ElementStatisticsClass(object):
-    def __init__(self):
-        self.element_count = 0
-        self.parsed_tag_count = 0
-        self.invalid_tag_count = 0
-
-        self.valid_tag_dict = {}
-        self.invalid_tag_dict = {}
-
-    @staticmethod
-    def _order_tags_dict(the_dict):
-        in_order = {}
-        for key, value in sorted(the_dict.items(), key=lambda item: item[1], reverse=True):
-            in_order[key] = value
-        return in_order
-
-    @property
-    def ordered_valid_tags(self):
-        return self._order_tags_dict(self.valid_tag_dict)
-
-    @property
-    def ordered_invalid_tags(self):
-        return self._order_tags_dict(self.invalid_tag_dict)
+# silent unless the caller configures logging, running the script sets it up from VERBOSE
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
 
 
-the_stats = ElementStatisticsClass()
-
+BLOCK_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'p')
 
-class ChoppedH1(object):
-    def __init__(self, h1_tag, index):
-        self.h1_tag = h1_tag
-        self.string = self.h1_tag.string.strip()
-        self.slug = slugify(self.string, separator="_")
-        self.index = index
 
-        self.soup = BeautifulSoup('<topic></topic>', features='xml')
-        the_topic = self.soup.topic
-        the_topic['id'] = 'tbd__{:05d}'.format(self.index)
-        the_topic['xmlns:ditaarch'] = XMLNS_DITAARCH
+def _skipped_over(element):
+    # the parts of element that hold no heading or <p>, those have already been yielded on their own
+    if element.tag in BLOCK_TAGS:
+        return
 
-        title_tag = self.soup.new_tag("title")
-        title_tag.string = self.string
-        the_topic.append(title_tag)
+    if next(element.iter(*BLOCK_TAGS), None) is None:
+        yield element
+        return
 
-        # add short description element after title element
-        shortdesc_tag = self.soup.new_tag("shortdesc")
-        shortdesc_tag.string = ""
-        the_topic.append(shortdesc_tag)
+    # a wrapper, such as Word's <div class=WordSection1>
+    for child in element.iterchildren(tag=etree.Element):
+        yield from _skipped_over(child)
 
-        # add the prolog element with author string
-        prolog_tag = self.soup.new_tag("prolog")
-        the_topic.append(prolog_tag)
 
-        author_tag = self.soup.new_tag("author")
-        author_tag.string = "TurboChopper!"
-        prolog_tag.append(author_tag)
+def iter_body_blocks(html):
+    # streams the document: yields each heading and <p> in <body> once it has been parsed, however deeply
+    # it is wrapped, preceded by whatever else was skipped over to reach it, then frees them
+    body = None
+    for event, element in etree.iterparse(html, tag=BLOCK_TAGS, html=True, encoding=SOURCE_ENCODING):
+        if body is None:
+            the_html = element.getroottree().getroot()
+            the_comment = the_html.getprevious()
+            if the_html.tag != 'html' or the_comment is None or the_comment.tag is not etree.Comment:
+                log.error('Unexpected xml structure!')
+                exit(-1)
 
-        self.body_tag = self.soup.new_tag("body")
-        the_topic.append(self.body_tag)
-
-    def __str__(self):
-        return "{:>5}  {}".format(self.index, self.slug)
-
-    @staticmethod
-    def _count_this_tag(stats_dict, the_element):
-        try:
-            stats_dict[the_element.name] += 1
-        except KeyError:
-            stats_dict[the_element.name] = 1
-
-    def add_this_element(self, this_element):
-        the_stats.element_count += 1
-
-        if this_element.name not in VALID_ELEMENTS:
-            the_stats.invalid_tag_count += 1
-            self._count_this_tag(the_stats.invalid_tag_dict, this_element)
-            return
-
-        the_stats.parsed_tag_count += 1
-        self._count_this_tag(the_stats.valid_tag_dict, this_element)
-
-        if this_element.name == 'p':
-            # is this valid for all <p> tags?
-            add_this_tag = self.soup.new_tag(this_element.name)
-
-            # builds the new string from the strings in the children of this_element
-
-            string_list = []
-            for this_child in this_element.children:
-                if this_child.string is not None:
-                    string_list.append(this_child.string.strip())
-                    self._count_this_tag(the_stats.valid_tag_dict, this_child)
-
-            add_this_tag.string = ' '.join(string_list)
-
-            # this is the same as the 6 (commented) lines above!
-            # add_this_tag.string = ' '.join([c.string.strip() for c in this_element.children if c.string is not None])
+            body = the_html.find('body')
 
+        # this element and its ancestors inside <body>, outermost first
+        path = [element]
+        for ancestor in element.iterancestors():
+            if ancestor is body:
+                break
+            path.append(ancestor)
         else:
-            print("Unexpected tag received!")
-            exit(-1)
-
-        # finally, add the new tag!
-        self.body_tag.append(add_this_tag)
-
-    def write_to_file(self, output_path):
-        output_file = os.path.join(output_path, self.slug + EXTN_XML)
-
-        print("{:>5}  {}".format(self.index, output_file))
-        with open(output_file, 'w') as fptr:
-            fptr.write(self.soup.prettify())
-
-
-def main():
-    this_script = os.path.basename(sys.argv[0])
-    print('running {}:'.format(this_script))
-    print(full_path)
-
-    with open(full_path) as fptr:
-        soup = parse_this(fptr)
-
-    soup_as_a_list = list(soup)
-
-    type_tests = [type(soup_as_a_list[0]) == Comment,
-                  type(soup_as_a_list[1]) == Tag,
-                  ]
-
-    if not all(type_tests):
-        print('Unexpected xml structure!')
-        exit(-1)
-
-    the_comment = soup_as_a_list[0]
-    the_html = soup_as_a_list[1]
-
-    print('Elements in <body>: {}'.format(len(the_html.body)))
-
-    promote_these = ['h2', 'h3', 'h4', 'h5']
-
-    for promotion_needed in promote_these:
-        to_promote = soup.find_all(promotion_needed)
-        print("Promoting: {} - {} found".format(promotion_needed, len(to_promote)))
-
-        for promote_this in to_promote:
-            promote_this.name = 'h1'
-
-    the_h1s = soup.find_all('h1')
-
-    # suppressing any h1 tags that only have whitespace in their string
-    # h1_strings = [h.string for h in the_h1s if not h.string.isspace()]
-
-    h1_strings = []
-    for this_h1 in the_h1s:
-        if this_h1.string is None:
-            continue
-
-        if not this_h1.string.isspace():
-            h1_strings.append(this_h1.string.strip())
-
-    if DUPLICATES_TRIGGERS_ERROR:
-        if not len(h1_strings) == len(set(h1_strings)):
-            print('Duplicated text in h1 tags!')
-            exit(-1)
-
-    # where to put the output...
-    doc_title = slugify(h1_strings[0], separator="_")
-    output_folder = os.path.join(output_root, doc_title)
-    os.makedirs(output_folder, exist_ok=True)
-
-    chopped_list = []
-    h1_index = 0
-    # for this_h1 in the_h1s[89:90]:
-    for this_h1 in the_h1s:
-        if this_h1.string is None:
-            continue
-
-        the_tests = [this_h1.string.isspace(),
-                     slugify(this_h1.string, separator="_") == doc_title,
-                     ]
-        if any(the_tests):
             continue
 
-        h1_index += 1
-
-        chopped_thing = ChoppedH1(this_h1, h1_index)
-        print(chopped_thing)
-
-        # print('^^^', h1_index, this_h1.name, type(this_h1))
-        # print('Next element count: {}'.format(len(list(this_h1.next_elements))))
-
-        for n_index, this_element in enumerate(this_h1.next_elements):
-            if not type(this_element) == Tag:
-                continue
-
-            assert isinstance(this_element, Tag)
-            # print(n_index, type(this_element), this_element.name)
-
-            if this_element.name == 'h1':
-                # print("====== next h1 found! {}".format(this_element.string))
-                break
-
-            # add element to the topic
-            chopped_thing.add_this_element(this_element)
-
-        # add to array for looping later...
-        chopped_list.append(chopped_thing)
-
-    print('\nWriting XML to file:')
-    for chopped_thing in chopped_list:
-        chopped_thing.write_to_file(output_folder)
-        print(chopped_thing.soup.prettify())
-
-    print('')
-    print('   Valid tag list: {}'.format(VALID_ELEMENTS))
-    print('  Total tag count: {}'.format(the_stats.element_count))
-    print(' Parsed tag count: {}'.format(the_stats.parsed_tag_count))
-    for key, value in the_stats.ordered_valid_tags.items():
-        if key is None:
-            key = 'None'
-        print('{:>16} {:>4}'.format(key, value))
-
-    print('Invalid tag count: {}'.format(the_stats.invalid_tag_count))
-    for key, value in the_stats.ordered_invalid_tags.items():
-        print('{:>16} {:>4}'.format(key, value))
-
-
-def test_fn(a, b, c=None):
-    print(a, b, c)
-
-
-if __name__ == "__main__":
-    main()
-
-    # test_fn(a=45, b=76, c=89)
-# turbo_chopper.py
-#
-# License: MIT: https://www.monitis.com/blog/software-licensing-types-explained/
-#
-# Copyright (C) 2019 Kristine Conley & Richard Brockie
-#
-# Permission is hereby granted, free of charge, to any person
-# obtaining a copy of this software and associated documentation files
-# (the “Software”), to deal in the Software without restriction, including
-# without limitation the rights to use, copy, modify, merge, publish, distribute,
-# sub-license, and/or sell copies of the Software, and to permit persons to whom
-# the Software is furnished to do so, subject to the following conditions:
-#
-# The above copyright notice and this permission notice shall be included
-# in all copies or substantial portions of the Software.
-
-"""! @brief Example Python script with Doxygen style comments."""
-
-##
-# @mainpage About Turbochopper
-#
-# @section description_main What does Turbochopper do?
-# Turbochopper is a python script that takes one long HTML file and grossly prepares it for use with a DITA publishing tool. 
-# Turbochopper wraps the content of one H1 tag and its p tags in a valid XML topic element. It also names each file and outputs the topics in a directory.
-#
-# @section description_rationale Why use Turbochopper?
-# Turbochopper can save you time for proof of concept projects. 
-# For example, when working with a team of developers who already were collaborating to produce documentation using
-# Google Docs, I exported the user guide as HTML, ran Turbochopper, and then groomed the topics in Structured FrameMaker (DITA). 
-# Next, I made a DITA map and output these docmentation deliverables: 
-#   - PDF
-#   - HTML
-#
-# Even though Turbochopper's capabilities are quite limited, it did save me a significant amount of file preparation time.
-#
-# @section description_start Getting Started
-#   -# Get Turbochopper from GitHub (@ref https://github.com/dumpydog212/turbochopper)
-#   -# Set these variables in turbo_chopper.py:
-#       - _filename_, which is the name of the HTML source file.
-#       - _source_folder_, which is the relative path to the location of the HTML source file.
-#       - _output_root_, which is the location to which you want tubochopper to write.
-#   -# Run the script.
-#
-# (c) 2021 Kristi Conley. All rights reserved.
-
-# Imports
-import os
-import sys
-
-from slugify import slugify
+        # drop everything already handled, at each level on the way down to this element
+        for node in reversed(path):
+            parent = node.getparent()
+            while node.getprevious() is not None:
+                if isinstance(parent[0].tag, str):
+                    yield from _skipped_over(parent[0])
+                del parent[0]
 
-from bs4 import BeautifulSoup
-from bs4.element import Tag
-from bs4.element import Comment
-from bs4.element import NavigableString
+        yield element
 
-DUPLICATES_TRIGGERS_ERROR = False
+        # finished with it, so drop its content
+        element.clear()
 
-VALID_ELEMENTS = ['p']
+    if body is not None:
+        # whatever follows the last heading or <p>
+        for element in body.iterchildren(tag=etree.Element):
+            yield from _skipped_over(element)
 
-XMLNS_DITAARCH = "http://dita.oasis-open.org/architecture/2005/"
-EXTN_XML = '.xml'
 
-filename = 'example.html'
-source_folder = '/Users/kconley/poc_md2xml'
+SLUG_DISALLOWED = re.compile(r'[^a-z0-9]+')
+SLUG_DIGIT_COMMA = re.compile(r'(?<=\d),(?=\d)')
 
-full_path = os.path.join(source_folder, filename)
 
-output_root = '/Users/kconley/Desktop/xfer to Win 10 VM/turbo_chopper_output'
+@functools.lru_cache(maxsize=4096)
+def slug_of(text):
+    # every h1 is slugified once for the doc title check and again for its file name
+    if not text.isascii() or '&' in text:
+        # transliteration and html entities are left to python-slugify
+        return slugify(text, separator="_")
 
+    # plain ASCII gives the same slug as python-slugify, without its unicode normalisation passes
+    if ',' in text:
+        text = SLUG_DIGIT_COMMA.sub('', text)
 
-def parse_this(html):
-    return BeautifulSoup(html, features="lxml")
-    # return BeautifulSoup(html, features="html.parser")
+    return SLUG_DISALLOWED.sub('_', text.lower()).strip('_')
 
 
 class ElementStatisticsClass(object):
@@ -389,223 +169,231 @@ class ElementStatisticsClass(object):
         self.parsed_tag_count = 0
         self.invalid_tag_count = 0
 
-        self.valid_tag_dict = {}
-        self.invalid_tag_dict = {}
-
-    @staticmethod
-    def _order_tags_dict(the_dict):
-        in_order = {}
-        for key, value in sorted(the_dict.items(), key=lambda item: item[1], reverse=True):
-            in_order[key] = value
-        return in_order
+        self.valid_tag_dict = collections.Counter()
+        self.invalid_tag_dict = collections.Counter()
 
     @property
     def ordered_valid_tags(self):
-        return self._order_tags_dict(self.valid_tag_dict)
+        return dict(self.valid_tag_dict.most_common())
 
     @property
     def ordered_invalid_tags(self):
-        return self._order_tags_dict(self.invalid_tag_dict)
+        return dict(self.invalid_tag_dict.most_common())
 
 
 the_stats = ElementStatisticsClass()
 
 
-class ChoppedH1(object):
-    def __init__(self, h1_tag, index):
-        self.h1_tag = h1_tag
-        self.string = self.h1_tag.string.strip()
-        self.slug = slugify(self.string, separator="_")
-        self.index = index
-
-        self.soup = BeautifulSoup('<topic></topic>', features='xml')
-        the_topic = self.soup.topic
-        the_topic['id'] = 'tbd__{:05d}'.format(self.index)
-        the_topic['xmlns:ditaarch'] = XMLNS_DITAARCH
+def _build_topic_template():
+    # parsed once at import, each ChoppedH1 gets a copy of this skeleton
+    template = etree.fromstring('<topic id="" xmlns:ditaarch="{}">'
+                                '<title/><shortdesc/><prolog><author>TurboChopper!</author></prolog><body/>'
+                                '</topic>'.format(XMLNS_DITAARCH))
+    template.find('shortdesc').text = ""
+    return template
 
-        title_tag = self.soup.new_tag("title")
-        title_tag.string = self.string
-        the_topic.append(title_tag)
 
-        # add short description element after title element
-        shortdesc_tag = self.soup.new_tag("shortdesc")
-        shortdesc_tag.string = ""
-        the_topic.append(shortdesc_tag)
+_TOPIC_TEMPLATE = _build_topic_template()
 
-        # add the prolog element with author string
-        prolog_tag = self.soup.new_tag("prolog")
-        the_topic.append(prolog_tag)
 
-        author_tag = self.soup.new_tag("author")
-        author_tag.string = "TurboChopper!"
-        prolog_tag.append(author_tag)
+class ChoppedH1(object):
+    def __init__(self, h1_string, index):
+        self.string = h1_string.strip()
+        self.slug = slug_of(self.string)
+        self.index = index
 
-        self.body_tag = self.soup.new_tag("body")
-        the_topic.append(self.body_tag)
+        # (tag, text) pairs, plain strings only so that the whole object can be sent to a worker process
+        self.contents = []
 
     def __str__(self):
         return "{:>5}  {}".format(self.index, self.slug)
 
-    @staticmethod
-    def _count_this_tag(stats_dict, the_element):
-        try:
-            stats_dict[the_element.name] += 1
-        except KeyError:
-            stats_dict[the_element.name] = 1
-
     def add_this_element(self, this_element):
-        the_stats.element_count += 1
-
-        if this_element.name not in VALID_ELEMENTS:
-            the_stats.invalid_tag_count += 1
-            self._count_this_tag(the_stats.invalid_tag_dict, this_element)
+        # called once per block in the document: keep the module global in a local
+        stats = the_stats
+        stats.element_count += 1
+        tag_name = this_element.tag
+
+        if tag_name not in VALID_ELEMENTS:
+            stats.invalid_tag_count += 1
+            stats.invalid_tag_dict[tag_name] += 1
             return
 
-        the_stats.parsed_tag_count += 1
-        self._count_this_tag(the_stats.valid_tag_dict, this_element)
+        stats.parsed_tag_count += 1
+        stats.valid_tag_dict[tag_name] += 1
 
-        if this_element.name == 'p':
+        if tag_name == 'p':
             # is this valid for all <p> tags?
-            add_this_tag = self.soup.new_tag(this_element.name)
-
-            # builds the new string from the strings in the children of this_element
-
-            string_list = []
-            for this_child in this_element.children:
-                if this_child.string is not None:
-                    string_list.append(this_child.string.strip())
-                    self._count_this_tag(the_stats.valid_tag_dict, this_child)
 
-            add_this_tag.string = ' '.join(string_list)
+            # strip each piece of text under this_element, drop the empty ones
+            # and join the rest with single spaces
+            the_text = ' '.join(filter(None, map(str.strip, this_element.itertext())))
+            stats.valid_tag_dict.update(c.tag for c in this_element.iterchildren(tag=etree.Element))
 
-            # this is the same as the 6 (commented) lines above!
-            # add_this_tag.string = ' '.join([c.string.strip() for c in this_element.children if c.string is not None])
+            self.contents.append((tag_name, the_text))
 
         else:
-            print("Unexpected tag received!")
+            log.error("Unexpected tag received!")
             exit(-1)
 
-        # finally, add the new tag!
-        self.body_tag.append(add_this_tag)
+    def build_tree(self):
+        # copy of the skeleton parsed at import, its children are always title, shortdesc, prolog, body
+        the_topic = copy.deepcopy(_TOPIC_TEMPLATE)
+        title_tag, shortdesc_tag, prolog_tag, body_tag = the_topic
 
-    def write_to_file(self, output_path):
-        output_file = os.path.join(output_path, self.slug + EXTN_XML)
+        the_topic.set('id', 'tbd__{:05d}'.format(self.index))
+        title_tag.text = self.string
 
-        print("{:>5}  {}".format(self.index, output_file))
-        with open(output_file, 'w') as fptr:
-            fptr.write(self.soup.prettify())
+        for tag_name, text in self.contents:
+            etree.SubElement(body_tag, tag_name).text = text
 
+        return etree.ElementTree(the_topic)
 
-def main():
-    this_script = os.path.basename(sys.argv[0])
-    print('running {}:'.format(this_script))
-    print(full_path)
-
-    with open(full_path) as fptr:
-        soup = parse_this(fptr)
+    def to_bytes(self):
+        # already UTF-8 encoded, ready for a binary file or stream
+        return etree.tostring(self.build_tree(), pretty_print=True, xml_declaration=True, encoding='UTF-8')
 
-    soup_as_a_list = list(soup)
+    def write_to_file(self, output_path):
+        output_file = os.path.join(output_path, self.slug + EXTN_XML)
 
-    type_tests = [type(soup_as_a_list[0]) == Comment,
-                  type(soup_as_a_list[1]) == Tag,
-                  ]
+        with open(output_file, 'wb') as fptr:
+            fptr.write(self.to_bytes())
 
-    if not all(type_tests):
-        print('Unexpected xml structure!')
-        exit(-1)
+        return output_file
 
-    the_comment = soup_as_a_list[0]
-    the_html = soup_as_a_list[1]
 
-    print('Elements in <body>: {}'.format(len(the_html.body)))
+def write_these(chopped_list, output_path):
+    # one worker task: topics are sent over in batches to keep the inter-process traffic down
+    return [chopped_thing.write_to_file(output_path) for chopped_thing in chopped_list]
 
-    promote_these = ['h2', 'h3', 'h4', 'h5']
 
-    for promotion_needed in promote_these:
-        to_promote = soup.find_all(promotion_needed)
-        print("Promoting: {} - {} found".format(promotion_needed, len(to_promote)))
+def main():
+    this_script = os.path.basename(sys.argv[0])
+    log.info('running %s:', this_script)
+    log.info(full_path)
 
-        for promote_this in to_promote:
-            promote_this.name = 'h1'
+    promote_these = ['h2', 'h3', 'h4', 'h5']
+    promoted = collections.Counter()
 
-    the_h1s = soup.find_all('h1')
+    seen_slugs = set()
+    doc_title = None
+    output_folder = None
 
-    # suppressing any h1 tags that only have whitespace in their string
-    # h1_strings = [h.string for h in the_h1s if not h.string.isspace()]
+    body_count = 0
+    chopped_thing = None
+    add_this_element = None
+    h1_index = 0
+    chopped_list = []
+    held_back = []
+    writing = []
+
+    # the topic dumps are only serialized when someone is going to see them, otherwise only the
+    # index of each topic is kept for the report, so its text can be freed once it has been written
+    dump_topics = log.isEnabledFor(logging.DEBUG)
+
+    # every topic is independent, so each one is handed to a worker process to build and write
+    # as soon as the next h1 closes it, while the rest of the document is still being parsed
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor, open(full_path, 'rb') as fptr:
+        def write_batch(batch):
+            if not writing:
+                os.makedirs(output_folder, exist_ok=True)
+
+            writing.append(([c.index for c in batch], batch if dump_topics else None,
+                            executor.submit(write_these, batch, output_folder)))
+
+        for this_element in iter_body_blocks(fptr):
+            body_count += 1
+            tag_name = this_element.tag
+
+            if tag_name in promote_these:
+                promoted[tag_name] += 1
+                tag_name = 'h1'
+
+            if not tag_name == 'h1':
+                # the topic is everything after its h1, up to the next one
+                if add_this_element is not None:
+                    add_this_element(this_element)
+                continue
 
-    h1_strings = []
-    for this_h1 in the_h1s:
-        if this_h1.string is None:
-            continue
+            if chopped_thing is not None:
+                chopped_list.append(chopped_thing)
+                chopped_thing = add_this_element = None
+
+                if len(chopped_list) == TOPICS_PER_TASK:
+                    if DUPLICATES_TRIGGERS_ERROR:
+                        # nothing is written until the whole document has been checked for duplicates
+                        held_back.append(chopped_list)
+                    else:
+                        write_batch(chopped_list)
+                    chopped_list = []
+
+            # suppressing any h1 tags that only have whitespace in their text
+            h1_string = ''.join(this_element.itertext()).strip()
+            if not h1_string:
+                continue
 
-        if not this_h1.string.isspace():
-            h1_strings.append(this_h1.string.strip())
+            # a repeated slug would be written over the earlier topic's file (the doc title is in here too)
+            h1_slug = slug_of(h1_string)
+            if h1_slug in seen_slugs:
+                if DUPLICATES_TRIGGERS_ERROR:
+                    log.error('Duplicated text in h1 tags!')
+                    exit(-1)
 
-    if DUPLICATES_TRIGGERS_ERROR:
-        if not len(h1_strings) == len(set(h1_strings)):
-            print('Duplicated text in h1 tags!')
-            exit(-1)
+                log.warning('Skipping duplicate h1 %r (file name %s already used)', h1_string, h1_slug)
+                continue
 
-    # where to put the output...
-    doc_title = slugify(h1_strings[0], separator="_")
-    output_folder = os.path.join(output_root, doc_title)
-    os.makedirs(output_folder, exist_ok=True)
+            seen_slugs.add(h1_slug)
 
-    chopped_list = []
-    h1_index = 0
-    # for this_h1 in the_h1s[89:90]:
-    for this_h1 in the_h1s:
-        if this_h1.string is None:
-            continue
+            if doc_title is None:
+                # where to put the output...
+                doc_title = h1_slug
+                output_folder = os.path.join(output_root, doc_title)
+                continue
 
-        the_tests = [this_h1.string.isspace(),
-                     slugify(this_h1.string, separator="_") == doc_title,
-                     ]
-        if any(the_tests):
-            continue
+            h1_index += 1
 
-        h1_index += 1
+            chopped_thing = ChoppedH1(h1_string, h1_index)
+            # bound once per topic rather than looked up for every block in it
+            add_this_element = chopped_thing.add_this_element
+            log.debug('%s', chopped_thing)
 
-        chopped_thing = ChoppedH1(this_h1, h1_index)
-        print(chopped_thing)
+        if chopped_thing is not None:
+            chopped_list.append(chopped_thing)
 
-        # print('^^^', h1_index, this_h1.name, type(this_h1))
-        # print('Next element count: {}'.format(len(list(this_h1.next_elements))))
+        if not h1_index:
+            # no heading at all, or only the doc title
+            log.error('No topics found in <body>!')
+            exit(-1)
 
-        for n_index, this_element in enumerate(this_h1.next_elements):
-            if not type(this_element) == Tag:
-                continue
+        if chopped_list:
+            held_back.append(chopped_list)
 
-            assert isinstance(this_element, Tag)
-            # print(n_index, type(this_element), this_element.name)
+        for chopped_list in held_back:
+            write_batch(chopped_list)
 
-            if this_element.name == 'h1':
-                # print("====== next h1 found! {}".format(this_element.string))
-                break
+        log.debug('Elements in <body>: %d', body_count)
 
-            # add element to the topic
-            chopped_thing.add_this_element(this_element)
+        for promotion_needed in promote_these:
+            log.info("Promoting: %s - %d found", promotion_needed, promoted[promotion_needed])
 
-        # add to array for looping later...
-        chopped_list.append(chopped_thing)
+        log.debug('\nWriting XML to file:')
+        for indices, chopped_list, written in writing:
+            for n, output_file in enumerate(written.result()):
+                log.debug("%5d  %s", indices[n], output_file)
 
-    print('\nWriting XML to file:')
-    for chopped_thing in chopped_list:
-        chopped_thing.write_to_file(output_folder)
-        print(chopped_thing.soup.prettify())
+                if chopped_list is not None:
+                    log.debug(chopped_list[n].to_bytes().decode('utf-8'))
 
-    print('')
-    print('   Valid tag list: {}'.format(VALID_ELEMENTS))
-    print('  Total tag count: {}'.format(the_stats.element_count))
-    print(' Parsed tag count: {}'.format(the_stats.parsed_tag_count))
+    log.info('')
+    log.info('   Valid tag list: %s', sorted(VALID_ELEMENTS))
+    log.info('  Total tag count: %d', the_stats.element_count)
+    log.info(' Parsed tag count: %d', the_stats.parsed_tag_count)
     for key, value in the_stats.ordered_valid_tags.items():
-        if key is None:
-            key = 'None'
-        print('{:>16} {:>4}'.format(key, value))
+        log.info('%16s %4d', key, value)
 
-    print('Invalid tag count: {}'.format(the_stats.invalid_tag_count))
+    log.info('Invalid tag count: %d', the_stats.invalid_tag_count)
     for key, value in the_stats.ordered_invalid_tags.items():
-        print('{:>16} {:>4}'.format(key, value))
+        log.info('%16s %4d', key, value)
 
 
 def test_fn(a, b, c=None):
@@ -613,6 +401,7 @@ def test_fn(a, b, c=None):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG if VERBOSE else logging.INFO, format='%(message)s', stream=sys.stdout)
     main()
 
     # test_fn(a=45, b=76, c=89)